@@ -0,0 +1,51 @@
+# Compare sequential vs concurrent Pose + Holistic inference on the same frames.
+# usage: python benchmark.py [camera index or video path] [frames]
+import sys
+import time
+import cv2
+import numpy as np
+from pose_estimation import PoseDetector
+
+def grab_frames(src, n):
+    cap = cv2.VideoCapture(int(src) if str(src).isdigit() else src)
+    frames = []
+    while len(frames) < n:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def time_detector(detector, frames, warmup=10):
+    for img in frames[:warmup]:
+        detector.find_pose(img, draw=False)
+    times = []
+    for img in frames:
+        start = time.perf_counter()
+        detector.find_pose(img, draw=False)
+        times.append((time.perf_counter() - start) * 1000)
+    return np.mean(times), np.percentile(times, 95)
+
+def main():
+    src = sys.argv[1] if len(sys.argv) > 1 else 0
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    frames = grab_frames(src, n)
+    if not frames:
+        print("Failed to grab frames from", src)
+        return
+    print(f"{len(frames)} frames at {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    results = {}
+    for name, parallel in (("sequential", False), ("parallel", True)):
+        detector = PoseDetector(parallel=parallel)
+        try:
+            mean, p95 = time_detector(detector, frames)
+        finally:
+            detector.close()
+        results[name] = mean
+        print(f"{name:>10}: mean {mean:6.1f} ms   p95 {p95:6.1f} ms")
+    print(f"  speed-up: {results['sequential'] / results['parallel']:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import time
+
+import cv2
+
+
+class Frame:
+    def __init__(self, img, seq, t_capture, t_read):
+        self.img = img
+        self.seq = seq              # increases by one per grabbed frame
+        self.t_capture = t_capture  # time.monotonic() the frame left the sensor (best estimate)
+        self.t_read = t_read        # time.monotonic() the driver handed it to us
+
+    @property
+    def age(self):
+        return time.monotonic() - self.t_capture
+
+
+class Camera:
+    """
+    Low-latency webcam: MJPG at a fixed frame rate with the driver queue cut
+    to one buffer, so read() returns the newest frame rather than one that
+    sat in a queue.
+
+    Each Frame is stamped with a sequence number and a capture time. Where
+    the backend exposes buffer timestamps on the monotonic clock (V4L2 on
+    Linux) that is the driver's own timestamp; otherwise it falls back to
+    the moment grab() returned, which hides the camera's internal lag.
+    """
+
+    def __init__(self, src=0, width=None, height=None, fps=30,
+                 fourcc="MJPG", buffer_size=1):
+        self.src = src
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.driver_timestamps = False
+        self._seq = 0
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.src)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open camera {self.src!r}")
+        # fourcc first: some drivers reset size/fps when the format changes
+        if self.fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        if self.width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.buffer_size:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+        return self
+
+    def read(self):
+        """Grab the next frame; returns None when the camera stops delivering."""
+        if not self.cap.grab():
+            return None
+        t_read = time.monotonic()
+        # only trust the driver timestamp if it's on our clock and plausible
+        stamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        self.driver_timestamps = 0.0 <= t_read - stamp < 1.0
+        t_capture = stamp if self.driver_timestamps else t_read
+
+        ret, img = self.cap.retrieve()
+        if not ret:
+            return None
+        self._seq += 1
+        return Frame(img, self._seq, t_capture, t_read)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
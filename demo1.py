@@ -1,10 +1,12 @@
+import asyncio
 import cv2
-import threading
-import queue
 import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from xarm import Controller, Servo
 import mediapipe as mp
+from runtime import Runtime
+from pose_estimation import POSE_MIRROR_PAIRS, LevelController, mirror_landmarks
 
 # ─── ROBOT SETUP ────────────────────────────────────────────────────────────────
 arm = Controller('USB')
@@ -35,24 +37,20 @@ def move_all(jpos, duration=1000):
     arm.setPosition(servos, duration=duration, wait=True)
     time.sleep(0.5)
 
-def set_claw(pos):
-    p = clamp(1, pos)
-    current_positions[1] = p
-    move_all(current_positions)
-
 def human_angle_to_servo(joint, angle):
     lo, hi = range_map[joint]
     return int(lo + (angle/180)* (hi-lo))
 
-def go_to_pose(sh_ang, el_ang, hand_closed):
+async def go_to_pose(rt, sh_ang, el_ang, hand_closed):
     current_positions[4] = clamp(4, human_angle_to_servo(4, sh_ang))
     current_positions[3] = clamp(3, human_angle_to_servo(3, el_ang))
-    move_all(current_positions)
-    set_claw(closed if hand_closed else opened)
+    await rt.move(arm, current_positions)
+    current_positions[1] = clamp(1, closed if hand_closed else opened)
+    await rt.move(arm, current_positions)
 
 # ─── MEDIAPIPE DETECTOR ─────────────────────────────────────────────────────────
 class PoseDetector:
-    def __init__(self):
+    def __init__(self, parallel=False, mirror=False, frame_budget=None, scales=None):
         # pose detector
         self.mp_pose = mp.solutions.pose
         self.pose = self.mp_pose.Pose(
@@ -70,12 +68,59 @@ class PoseDetector:
             min_detection_confidence=0.7,
             min_tracking_confidence=0.7
         )
-
-    def find_pose(self, img, draw=False):
-        img = cv2.flip(img, 1)
+        # run Hands on a worker while Pose runs here (both release the GIL)
+        self.parallel = parallel
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix="hands") if parallel else None
+        # mirror landmarks instead of flipping every frame before inference
+        self.mirror = mirror
+        # with a frame_budget (seconds), step the input down through `scales`
+        # when inference runs slow; both models stay at their fixed complexity
+        if scales is None:
+            scales = (1.0,) if frame_budget is None else (1.0, 0.75, 0.5)
+        self.scales = scales
+        self.frame_budget = frame_budget
+        self.quality = LevelController(len(scales), frame_budget)
+
+    def stats(self):
+        latency = self.quality.latency
+        return {
+            "level": self.quality.level,
+            "model_complexity": 0,
+            "input_scale": self.scales[self.quality.level],
+            "inference_ms": None if latency is None else latency * 1000,
+            "frame_budget_ms": None if self.frame_budget is None else self.frame_budget * 1000,
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self.pose.close()
+        self.hands.close()
+
+    def find_pose(self, img, draw=False, preview=True):
+        draw = draw and preview
+        if not self.mirror:
+            img = cv2.flip(img, 1)
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.pose_res = self.pose.process(img_rgb)
-        self.hand_res = self.hands.process(img_rgb)
+        scale = self.scales[self.quality.level]
+        if scale != 1.0:
+            img_rgb = cv2.resize(img_rgb, None, fx=scale, fy=scale,
+                                 interpolation=cv2.INTER_AREA)
+        start = time.perf_counter()
+        if self.parallel:
+            hand_job = self._pool.submit(self.hands.process, img_rgb)
+            self.pose_res = self.pose.process(img_rgb)
+            self.hand_res = hand_job.result()
+        else:
+            self.pose_res = self.pose.process(img_rgb)
+            self.hand_res = self.hands.process(img_rgb)
+        self.quality.record(time.perf_counter() - start)
+        if self.mirror:
+            self._mirror_results()
+            if not preview:
+                return img
+            img = cv2.flip(img, 1)
         # optionally draw landmarks
         if draw and self.pose_res.pose_landmarks:
             mp.solutions.drawing_utils.draw_landmarks(
@@ -84,7 +129,21 @@ class PoseDetector:
             )
         return img
 
-    def find_position(self, img):
+    def _mirror_results(self):
+        # Pose pose_landmarks plus Hands landmarks/handedness; world
+        # landmarks are left unflipped
+        if self.pose_res.pose_landmarks:
+            mirror_landmarks(self.pose_res.pose_landmarks, POSE_MIRROR_PAIRS)
+        if self.hand_res.multi_hand_landmarks:
+            for hand in self.hand_res.multi_hand_landmarks:
+                mirror_landmarks(hand)
+            # Hands labels assume a mirrored input; swap them back
+            for handedness in self.hand_res.multi_handedness:
+                for c in handedness.classification:
+                    c.label = "Left" if c.label == "Right" else "Right"
+
+    def find_position(self, img, draw=False):
+        # draw: accepted for parity with pose_estimation; nothing is drawn here
         pose_list, hand_list = [], None
         # pose landmarks
         if self.pose_res.pose_landmarks:
@@ -120,37 +179,12 @@ class PoseDetector:
         # closed if at most 1 finger extended
         return ext <= 1
 
-# ─── CAMERA THREAD ───────────────────────────────────────────────────────────────
-def camera_thread(src, q):
-    cap = cv2.VideoCapture(src)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    while True:
-        ret, frame = cap.read()
-        if not ret: break
-        if not q.empty():
-            try: q.get_nowait()
-            except: pass
-        q.put(frame)
-    cap.release()
-
-# ─── MAIN LOOP ─────────────────────────────────────────────────────────────────
-def main():
-    q = queue.Queue(maxsize=1)
-    threading.Thread(target=camera_thread, args=(0,q), daemon=True).start()
-    detector = PoseDetector()
-
-    # neutral pose
-    current_positions.update({2:500,5:500,6:500,3:500,4:500,1:opened})
-    move_all(current_positions)
-
+# ─── CONTROL MODE ──────────────────────────────────────────────────────────────
+async def follow(rt):
+    detector = rt.detector
     while True:
-        if q.empty():
-            time.sleep(0.005)
-            continue
-        img = q.get()
-        img = detector.find_pose(img)
-        pose_lms, hand_lms = detector.find_position(img)
+        det = await rt.next_detection()
+        img, pose_lms, hand_lms = det.img, det.pose_lms, det.hand_lms
 
         sh = el = None
         closed = False
@@ -169,11 +203,21 @@ def main():
             cv2.putText(img, "FIST" if closed else "OPEN", (20,80),
                         cv2.FONT_HERSHEY_SIMPLEX, 1.0,
                         (0,0,255) if closed else (0,255,0),2)
-            go_to_pose(sh, el, closed)
+            # skipped while the arm is still moving; next frame retries
+            rt.actuate(go_to_pose(rt, sh, el, closed))
+
+        rt.show(img)
+
+# ─── MAIN ──────────────────────────────────────────────────────────────────────
+def main():
+    detector = PoseDetector(parallel=True, mirror=True, frame_budget=1/30)
+
+    # neutral pose
+    current_positions.update({2:500,5:500,6:500,3:500,4:500,1:opened})
+    move_all(current_positions)
 
-        cv2.imshow("Live Pose", img)
-        if cv2.waitKey(1)&0xFF==ord('q'): break
-    cv2.destroyAllWindows()
+    asyncio.run(Runtime(detector, follow, src=0, window="Live Pose",
+                        width=640, height=480).run())
 
 if __name__ == "__main__":
     main()
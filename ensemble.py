@@ -1,3 +1,4 @@
+import asyncio
 import cv2
 import mediapipe as mp
 import numpy as np
@@ -5,6 +6,7 @@ import math
 import time
 from xarm import Controller, Servo
 from pose_estimation import PoseDetector
+from runtime import Runtime
 
 # ─── ROBOT SETUP ────────────────────────────────────────────────────────────────
 arm = Controller('USB')
@@ -42,17 +44,12 @@ def move_all(jpos, duration=1000):
     arm.setPosition(servos, duration=duration, wait=True)
     time.sleep(0.5)
 
-def set_claw(position, duration=1000):
-    p = clamp(1, position)
-    current_positions[1] = p
-    move_all(current_positions, duration)
-
 def human_angle_to_servo(joint, angle_deg):
     lo, hi = range_map[joint]
     span = hi - lo
     return int(lo + (angle_deg / 180.0) * span)
 
-def go_to_pose(shoulder_angle, elbow_angle, hand_closed):
+async def go_to_pose(rt, shoulder_angle, elbow_angle, hand_closed):
     # shoulder → servo 4
     sh_p = clamp(4, human_angle_to_servo(4, shoulder_angle))
     # elbow    → servo 3
@@ -61,32 +58,19 @@ def go_to_pose(shoulder_angle, elbow_angle, hand_closed):
     current_positions[3] = el_p
 
     # apply
-    move_all(current_positions)
+    await rt.move(arm, current_positions)
 
     # claw
-    set_claw(closed if hand_closed else opened)
-
-# ─── MAIN LOOP ─────────────────────────────────────────────────────────────────
-def main():
-    cap = cv2.VideoCapture(0)
-    detector = PoseDetector()
+    current_positions[1] = clamp(1, closed if hand_closed else opened)
+    await rt.move(arm, current_positions)
 
-    # ─── Neutral start ─────────────────────────────────────────────────────────
-    print("[INFO] Moving robot to neutral pose…")
-    current_positions.update({2:500, 5:500, 6:500})
-    current_positions[3] = int((range_map[3][0] + range_map[3][1]) / 2)
-    current_positions[4] = int((range_map[4][0] + range_map[4][1]) / 2)
-    current_positions[1] = opened
-    move_all(current_positions)
-    # ───────────────────────────────────────────────────────────────────────────
+# ─── CONTROL MODE ──────────────────────────────────────────────────────────────
+async def snap_on_enter(rt):
+    detector = rt.detector
 
     while True:
-        ret, img = cap.read()
-        if not ret:
-            break
-
-        img = detector.find_pose(img)
-        pose_lms, hand_lms = detector.find_position(img)
+        det = await rt.next_detection()
+        img, pose_lms, hand_lms = det.img, det.pose_lms, det.hand_lms
 
         left_sh, left_el = None, None
         hand_closed = False
@@ -119,17 +103,26 @@ def main():
                     (10, img.shape[0]-30),
                     cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255,255,255), 2)
 
-        cv2.imshow("Mirror Pose", img)
-        key = cv2.waitKey(1) & 0xFF
+        rt.show(img)
+
+        if rt.poll_key() == 13 and left_sh is not None:
+            rt.actuate(go_to_pose(rt, left_sh, left_el, hand_closed))
 
-        if key == 13 and left_sh is not None:
-            go_to_pose(left_sh, left_el, hand_closed)
+# ─── MAIN ──────────────────────────────────────────────────────────────────────
+def main():
+    detector = PoseDetector(frame_budget=1/30, motion_gate=True,
+                            mirror=True, parallel=True)
 
-        if key == ord('q'):
-            break
+    # ─── Neutral start ─────────────────────────────────────────────────────────
+    print("[INFO] Moving robot to neutral pose…")
+    current_positions.update({2:500, 5:500, 6:500})
+    current_positions[3] = int((range_map[3][0] + range_map[3][1]) / 2)
+    current_positions[4] = int((range_map[4][0] + range_map[4][1]) / 2)
+    current_positions[1] = opened
+    move_all(current_positions)
+    # ───────────────────────────────────────────────────────────────────────────
 
-    cap.release()
-    cv2.destroyAllWindows()
+    asyncio.run(Runtime(detector, snap_on_enter, window="Mirror Pose").run())
 
 if __name__ == "__main__":
     main()
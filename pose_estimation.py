@@ -1,13 +1,123 @@
+import asyncio
 import cv2
 import mediapipe as mp
 import numpy as np
 import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# left shoulder, elbow, wrist, pinky, index, thumb, hip
+ARM_LANDMARKS = (11, 13, 15, 17, 19, 21, 23)
+# left wrist, pinky, index, thumb: the hand whose open/fist state drives the claw
+HAND_LANDMARKS = (15, 17, 19, 21)
+
+# pose landmark ids that trade places when the image is mirrored (left <-> right)
+POSE_MIRROR_PAIRS = [(1, 4), (2, 5), (3, 6), (7, 8), (9, 10)] + \
+                    [(i, i + 1) for i in range(11, 33, 2)]
+
+def mirror_landmarks(landmark_list, pairs=()):
+    """
+    Mirror a NormalizedLandmarkList in place: x -> 1 - x, and swap the
+    left/right ids in `pairs` so it matches a horizontally flipped image.
+    """
+    lms = landmark_list.landmark
+    for lm in lms:
+        lm.x = 1.0 - lm.x
+    for a, b in pairs:
+        tmp = type(lms[a])()
+        tmp.CopyFrom(lms[a])
+        lms[a].CopyFrom(lms[b])
+        lms[b].CopyFrom(tmp)
+
+class LevelController:
+    """
+    Picks a quality level (0 = most expensive) from measured inference time.
+    Steps down when the smoothed latency exceeds `frame_budget`, steps up
+    only below `headroom` of it, and waits `retry_frames` before retrying a
+    level that was too slow, so it doesn't oscillate.
+    """
+    def __init__(self, n_levels, frame_budget=None, headroom=0.6,
+                 settle_frames=30, retry_frames=300):
+        self.n_levels = n_levels
+        self.frame_budget = frame_budget
+        self.headroom = headroom            # fraction of the budget to allow a step up
+        self.settle_frames = settle_frames  # frames to measure before deciding again
+        self.retry_frames = retry_frames
+        self.level = 0
+        self.latency = None       # smoothed inference time at current level (s)
+        self._level_latency = {}  # level -> latency when we last left it
+        self._frames_at_level = 0
+
+    def record(self, elapsed):
+        """Add one inference time in seconds; returns True if the level changed."""
+        # exponential moving average of this level's inference time
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += 0.1 * (elapsed - self.latency)
+        self._frames_at_level += 1
+
+        if self.frame_budget is None or self._frames_at_level < self.settle_frames:
+            return False
+        if self.latency > self.frame_budget and self.level < self.n_levels - 1:
+            self._switch(self.level + 1)
+            return True
+        if self.latency < self.frame_budget * self.headroom and self.level > 0:
+            # hysteresis: don't bounce straight back to a level that was too slow
+            richer = self._level_latency.get(self.level - 1)
+            if (richer is None or richer <= self.frame_budget
+                    or self._frames_at_level >= self.retry_frames):
+                self._switch(self.level - 1)
+                return True
+        return False
+
+    def _switch(self, level):
+        self._level_latency[self.level] = self.latency
+        self.level = level
+        self.latency = None
+        self._frames_at_level = 0
 
 class PoseDetector:
     def __init__(self, mode=False, complexity=1, smooth_landmarks=True,
                  enable_segmentation=False, smooth_segmentation=True,
-                 min_detection_confidence=0.5, min_tracking_confidence=0.5):
-        
+                 min_detection_confidence=0.5, min_tracking_confidence=0.5,
+                 frame_budget=None, levels=None, parallel=False,
+                 motion_gate=False, motion_threshold=3.0, max_reuse_age=0.5,
+                 mirror=False):
+        """
+        frame_budget: target inference time per frame in seconds. When set,
+            the detector measures its own latency and steps through `levels`
+            to stay inside the budget.
+        levels: (model_complexity, input_scale) pairs ordered from most to
+            least expensive. With a budget, defaults to `complexity` down to 0
+            at full resolution, then complexity 0 at 3/4 and 1/2 scale;
+            without one, just `complexity` at full resolution.
+            Every complexity's graphs are built and primed at startup, so a
+            switch never waits on a model load. Standby graphs are also fed
+            a copy of a real frame every `standby_refresh` inferences on a
+            background worker (skipped while the previous feed is still
+            running), so their tracking state stays roughly that fresh
+            without adding to frame time. On a machine with no spare core
+            that work still competes for CPU and shows up in the measured
+            latency; landmarks may still settle for a frame or two after a
+            switch.
+        parallel: run the Pose and Holistic graphs concurrently on the same
+            frame (MediaPipe releases the GIL while a graph runs), so a frame
+            costs roughly the slower model instead of both.
+        motion_gate: skip inference and keep the previous landmarks while the
+            region around the arm is static. `motion_threshold` is the mean
+            absolute grey-level change (0-255) on a tiny thumbnail that counts
+            as motion, checked separately over the whole arm and over a tight
+            box around the hand so a fist opening isn't averaged away;
+            `max_reuse_age` (seconds) forces a refresh regardless.
+        mirror: feed the unflipped frame to MediaPipe and mirror the results
+            afterwards instead of flipping every frame. Only the fields this
+            class reads are converted: Pose `pose_landmarks` (x and left/right
+            ids) and Holistic's left/right hand landmarks (x and slots).
+            World landmarks, Holistic's pose/face landmarks and segmentation
+            masks stay in unflipped image space. The image itself is only
+            flipped when find_pose is told it will be previewed.
+        """
         self.mode = mode
         self.complexity = complexity
         self.smooth_landmarks = smooth_landmarks
@@ -17,36 +127,231 @@ class PoseDetector:
         self.min_tracking_confidence = min_tracking_confidence
         
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
+        self.mp_draw = mp.solutions.drawing_utils
+        self.mp_drawing_styles = mp.solutions.drawing_styles
+        self.mp_holistic = mp.solutions.holistic
+
+        # ── adaptive quality ──
+        self.frame_budget = frame_budget
+        if levels is None:
+            if frame_budget is None:
+                levels = [(self.complexity, 1.0)]
+            else:
+                levels = [(c, 1.0) for c in range(self.complexity, -1, -1)]
+                levels += [(0, 0.75), (0, 0.5)]
+        self.levels = levels
+        self.quality = LevelController(len(levels), frame_budget)
+        self.standby_refresh = 30  # inferences between feeding a standby graph
+        self._since_standby = 0
+        self._standby_turn = 0
+        self._standby_job = None
+        self._standby_complexity = None
+
+        # One graph pair per complexity; every one is built (and, when there
+        # is more than one, primed) up front so a level switch never loads a model
+        self._graphs = {}
+        for c in sorted({c for c, _ in self.levels}):
+            self._graphs[c] = self._build_graphs(c)
+        if len(self._graphs) > 1:
+            blank = np.zeros((64, 64, 3), dtype=np.uint8)
+            for graphs in self._graphs.values():
+                for graph in graphs:
+                    graph.process(blank)
+        self._standby_pool = (ThreadPoolExecutor(1, thread_name_prefix="standby")
+                              if len(self._graphs) > 1 else None)
+        self._use_level()
+
+        self.parallel = parallel
+        # the calling thread runs Pose itself; one worker is enough for Holistic
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix="holistic") if parallel else None
+
+        # ── motion gate ──
+        self.motion_gate = motion_gate
+        self.motion_threshold = motion_threshold
+        self.max_reuse_age = max_reuse_age
+        self.gate_size = (64, 48)
+        self.gate_margin = 0.1
+        self.hand_gate_margin = 0.05
+        self.reused_frames = 0
+        self.reused = False       # did the last find_pose keep earlier results?
+        self._gate_ref = None     # thumbnail of the last frame we ran inference on
+        self._gate_time = 0.0
+        self.results = None
+        self.holistic_results = None
+        self.mirror = mirror
+
+    def close(self):
+        """Shut down the worker pools and every MediaPipe graph."""
+        for pool in (self._pool, self._standby_pool):
+            if pool is not None:
+                pool.shutdown(wait=True)
+        self._pool = self._standby_pool = None
+        for graphs in self._graphs.values():
+            for graph in graphs:
+                graph.close()
+        self._graphs = {}
+
+    def _build_graphs(self, complexity):
+        pose = self.mp_pose.Pose(
             static_image_mode=self.mode,
-            model_complexity=self.complexity,
+            model_complexity=complexity,
             smooth_landmarks=self.smooth_landmarks,
             enable_segmentation=self.enable_segmentation,
             smooth_segmentation=self.smooth_segmentation,
             min_detection_confidence=self.min_detection_confidence,
             min_tracking_confidence=self.min_tracking_confidence
         )
-        self.mp_draw = mp.solutions.drawing_utils
-        self.mp_drawing_styles = mp.solutions.drawing_styles
-        
         # Initialize holistic model for hand landmarks
-        self.mp_holistic = mp.solutions.holistic
-        self.holistic = self.mp_holistic.Holistic(
+        holistic = self.mp_holistic.Holistic(
             static_image_mode=self.mode,
-            model_complexity=self.complexity,
+            model_complexity=complexity,
             smooth_landmarks=self.smooth_landmarks,
             min_detection_confidence=self.min_detection_confidence,
             min_tracking_confidence=self.min_tracking_confidence
         )
+        return pose, holistic
+
+    @property
+    def level(self):
+        return self.quality.level
+
+    def _use_level(self):
+        complexity = self.levels[self.level][0]
+        # never run one graph from two threads: let a standby feed on the
+        # graph we're switching to finish first (at most one pass)
+        if self._standby_job is not None and self._standby_complexity == complexity:
+            self._standby_job.result()
+        self.pose, self.holistic = self._graphs[complexity]
+
+    def stats(self):
+        complexity, scale = self.levels[self.level]
+        return {
+            "level": self.level,
+            "model_complexity": complexity,
+            "input_scale": scale,
+            "inference_ms": None if self.quality.latency is None else self.quality.latency * 1000,
+            "frame_budget_ms": None if self.frame_budget is None else self.frame_budget * 1000,
+            "reused_frames": self.reused_frames,
+        }
+
+    def _gate_boxes(self, h, w):
+        # boxes around the last arm and hand landmarks, or the whole frame
+        if self.results is None or not self.results.pose_landmarks:
+            return [(0, h, 0, w)]
+        return [self._gate_box(h, w, ARM_LANDMARKS, self.gate_margin),
+                self._gate_box(h, w, HAND_LANDMARKS, self.hand_gate_margin)]
+
+    def _gate_box(self, h, w, ids, m):
+        lms = self.results.pose_landmarks.landmark
+        xs = [lms[i].x for i in ids]
+        if self.mirror:
+            # landmarks are mirrored but the gate sees the unflipped frame
+            xs = [1.0 - x for x in xs]
+        ys = [lms[i].y for i in ids]
+        x0 = int(min(max(min(xs) - m, 0.0), 1.0) * w)
+        x1 = int(min(max(max(xs) + m, 0.0), 1.0) * w)
+        y0 = int(min(max(min(ys) - m, 0.0), 1.0) * h)
+        y1 = int(min(max(max(ys) + m, 0.0), 1.0) * h)
+        if x1 <= x0 or y1 <= y0:
+            return 0, h, 0, w
+        return y0, y1, x0, x1
+
+    def _scene_static(self, img):
+        """
+        True when the arm region barely changed since the last frame we ran
+        inference on, so the previous landmarks can be reused as-is.
+        """
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        tiny = cv2.resize(gray, self.gate_size,
+                          interpolation=cv2.INTER_AREA).astype(np.int16)
+        now = time.perf_counter()
+        if self._gate_ref is not None and now - self._gate_time < self.max_reuse_age:
+            diff = np.abs(tiny - self._gate_ref)
+            if all(diff[y0:y1, x0:x1].mean() < self.motion_threshold
+                   for y0, y1, x0, x1 in self._gate_boxes(*tiny.shape)):
+                self.reused_frames += 1
+                return True
+        # compare against the last inferred frame, not the previous one, so
+        # slow drift still adds up to a refresh
+        self._gate_ref = tiny
+        self._gate_time = now
+        return False
     
-    def find_pose(self, img, draw=True):
+    def _process(self, img):
+        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        # landmarks are normalized, so a downscaled input needs no remapping
+        scale = self.levels[self.level][1]
+        if scale != 1.0:
+            img_rgb = cv2.resize(img_rgb, None, fx=scale, fy=scale,
+                                 interpolation=cv2.INTER_AREA)
+        start = time.perf_counter()
+        if self.parallel:
+            # both graphs see the same img_rgb and we join before returning,
+            # so pose and hand landmarks always come from one frame
+            holistic_job = self._pool.submit(self.holistic.process, img_rgb)
+            self.results = self.pose.process(img_rgb)
+            self.holistic_results = holistic_job.result()
+        else:
+            self.results = self.pose.process(img_rgb)
+            self.holistic_results = self.holistic.process(img_rgb)
+        if self.quality.record(time.perf_counter() - start):
+            self._use_level()
+        self._feed_standby(img_rgb)
+        if self.mirror:
+            self._mirror_results()
+
+    def _feed_standby(self, img_rgb):
+        # keep the graphs we aren't using tracking the same scene: round-robin
+        # on the standby worker, results discarded, skipped while still busy
+        if self._standby_pool is None:
+            return
+        self._since_standby += 1
+        if self._since_standby < self.standby_refresh:
+            return
+        if self._standby_job is not None and not self._standby_job.done():
+            return
+        self._since_standby = 0
+        standby = [c for c in self._graphs if c != self.levels[self.level][0]]
+        self._standby_turn = (self._standby_turn + 1) % len(standby)
+        self._standby_complexity = standby[self._standby_turn]
+        self._standby_job = self._standby_pool.submit(
+            self._run_standby, self._standby_complexity, img_rgb.copy())
+
+    def _run_standby(self, complexity, img_rgb):
+        for graph in self._graphs[complexity]:
+            graph.process(img_rgb)
+
+    def _mirror_results(self):
+        # convert only what find_pose/find_position read into flipped-image
+        # space: Pose pose_landmarks and the Holistic hand landmarks
+        if self.results.pose_landmarks:
+            mirror_landmarks(self.results.pose_landmarks, POSE_MIRROR_PAIRS)
+        left = self.holistic_results.left_hand_landmarks
+        right = self.holistic_results.right_hand_landmarks
+        for hand in (left, right):
+            if hand:
+                mirror_landmarks(hand)
+        self.holistic_results = self.holistic_results._replace(
+            left_hand_landmarks=right, right_hand_landmarks=left)
+
+    def find_pose(self, img, draw=True, preview=True):
+        # preview=False: nobody will see the image, so never draw on it
+        draw = draw and preview
         # Flip the image horizontally for a later selfie-view display
         # This ensures left appears as left, right as right
-        img = cv2.flip(img, 1)
-        
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.pose.process(img_rgb)
-        self.holistic_results = self.holistic.process(img_rgb)
+        if not self.mirror:
+            img = cv2.flip(img, 1)
+
+        self.reused = self.motion_gate and self._scene_static(img)
+        if not self.reused:
+            self._process(img)
+
+        if self.mirror:
+            # landmarks are already mirrored; only the picture still needs it,
+            # and only if someone is going to look at it
+            if not preview:
+                return img
+            img = cv2.flip(img, 1)
         
         if self.results.pose_landmarks and draw:
             self.mp_draw.draw_landmarks(
@@ -159,20 +464,13 @@ class PoseDetector:
         
         return is_closed, avg_distance
 
-def main():
-    # Initialize webcam
-    cap = cv2.VideoCapture(0)
-    detector = PoseDetector()
-    
+async def preview(rt):
+    detector = rt.detector
+
     while True:
-        success, img = cap.read()
-        if not success:
-            print("Failed to grab frame from camera.")
-            break
-            
         # Find pose - image is flipped inside this function
-        img = detector.find_pose(img)
-        pose_landmarks, left_hand_landmarks = detector.find_position(img)
+        det = await rt.next_detection()
+        img, pose_landmarks, left_hand_landmarks = det.img, det.pose_lms, det.hand_lms
         
         if len(pose_landmarks) > 0:
             # Left arm angles - in the flipped image, what looks like left to the user
@@ -219,14 +517,13 @@ def main():
                     cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
         
         # Show image
-        cv2.imshow("Left Arm Pose Estimation", img)
-        
-        # Exit on 'q' key press
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-    
-    cap.release()
-    cv2.destroyAllWindows()
+        rt.show(img)
+
+def main():
+    # Runtime owns the webcam; 'q' or Ctrl-C exits
+    from runtime import Runtime
+    detector = PoseDetector(frame_budget=1/30, mirror=True)
+    asyncio.run(Runtime(detector, preview, window="Left Arm Pose Estimation").run())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,306 @@
+import asyncio
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import cv2
+
+from capture import Camera
+
+# ─── QUEUES ─────────────────────────────────────────────────────────────────────
+class LatestQueue(asyncio.Queue):
+    """Bounded queue that drops its oldest item instead of blocking the producer."""
+
+    def __init__(self, maxsize=1):
+        super().__init__(maxsize)
+        self.dropped = 0
+
+    def put_nowait(self, item):
+        while self.full():
+            self.get_nowait()
+            self.dropped += 1
+        super().put_nowait(item)
+
+
+class Detection:
+    def __init__(self, img, pose_lms, hand_lms, seq=None, t_capture=None):
+        self.img = img
+        self.pose_lms = pose_lms
+        self.hand_lms = hand_lms
+        self.seq = seq              # Frame.seq the landmarks came from
+        self.t_capture = t_capture  # ...and that frame's capture time
+
+
+# ─── RUNTIME ────────────────────────────────────────────────────────────────────
+class Runtime:
+    """
+    Runs capture → inference → control mode → preview as asyncio tasks.
+
+    Blocking calls (cap.read, MediaPipe process, arm.setPosition) each run on
+    their own single-thread executor so stages overlap without reordering.
+    Every queue between stages keeps only the newest items, so a slow stage
+    sees fresh frames instead of a backlog.
+
+    A control mode is a coroutine `mode(rt)` that pulls detections with
+    `await rt.next_detection()`, draws on them, hands them to `rt.show()` and
+    starts arm motions with `rt.actuate(...)`. Returning from the mode, pressing
+    'q' in the preview window or SIGINT shuts everything down cleanly.
+
+    With preview=False no window is opened and the detector is told its
+    image won't be shown: it draws nothing, and with mirror=True it also
+    skips flipping the frame.
+
+    Frames older than `max_frame_age` seconds when inference is ready for
+    them are dropped in favour of the next one. If the camera's own lag
+    reaches that limit, every frame would be dropped, so a warning is
+    printed once and dropping is switched off. stats() breaks glass-to-landmark
+    latency down into camera, queueing and inference time, sampled only on
+    frames that actually ran inference.
+    """
+
+    def __init__(self, detector, mode, src=0, window="Live Pose",
+                 width=None, height=None, fps=30, queue_size=1, preview=True,
+                 max_frame_age=0.25, camera=None):
+        self.detector = detector
+        self.mode = mode
+        self.camera = camera or Camera(src, width=width, height=height, fps=fps)
+        self.window = window
+        self.preview_enabled = preview
+        self.max_frame_age = max_frame_age
+        self.stale_frames = 0
+        self._source = (None, None)  # (seq, t_capture) of the last inferred frame
+        self.latency = {}  # stage -> smoothed milliseconds
+        self._level = None
+
+        # queues are built in run(): before Python 3.10 they bind to the
+        # event loop current at construction, not the one asyncio.run starts
+        self.queue_size = queue_size
+        self.frames = None
+        self.detections = None
+        self.preview = None
+        self.keys = None
+
+        self._capture_pool = ThreadPoolExecutor(1, thread_name_prefix="capture")
+        self._infer_pool = ThreadPoolExecutor(1, thread_name_prefix="inference")
+        self._motion_pool = ThreadPoolExecutor(1, thread_name_prefix="motion")
+        self._motion = None
+        self._stopped = None
+        self._error = None
+
+    # ── public API for control modes ──────────────────────────────────────────
+    async def next_detection(self):
+        return await self.detections.get()
+
+    def show(self, img):
+        if self.preview_enabled:
+            self.preview.put_nowait(img)
+
+    def poll_key(self):
+        """Return the next key pressed in the preview window, or None."""
+        if self.keys.empty():
+            return None
+        return self.keys.get_nowait()
+
+    @property
+    def moving(self):
+        return self._motion is not None and not self._motion.done()
+
+    def actuate(self, coro):
+        """
+        Start `coro` as the arm's current motion unless one is still running.
+        Returns True if the motion was started.
+        """
+        if self.moving:
+            coro.close()
+            return False
+        self._motion = asyncio.create_task(coro)
+        self._motion.add_done_callback(self._on_task_done)
+        return True
+
+    async def move(self, arm, jpos, duration=1000):
+        """Send joint positions and wait until the arm reports the motion done."""
+        from xarm import Servo  # preview-only modes run without the arm SDK
+        servos = [Servo(j, p) for j, p in jpos.items()]
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self._motion_pool,
+            partial(arm.setPosition, servos, duration=duration, wait=True))
+
+    def stats(self):
+        """Queue drops, stage latencies and whatever the detector reports."""
+        stats = {
+            "dropped_frames": self.frames.dropped if self.frames else 0,
+            "stale_frames": self.stale_frames,
+            "dropped_detections": self.detections.dropped if self.detections else 0,
+            "driver_timestamps": self.camera.driver_timestamps,
+        }
+        stats.update({f"{stage}_ms": ms for stage, ms in self.latency.items()})
+        if hasattr(self.detector, "stats"):
+            stats.update(self.detector.stats())
+        return stats
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+
+    def _record(self, stage, seconds):
+        ms = seconds * 1000
+        prev = self.latency.get(stage)
+        self.latency[stage] = ms if prev is None else prev + 0.1 * (ms - prev)
+
+    # ── stages ────────────────────────────────────────────────────────────────
+    async def _capture(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            frame = await loop.run_in_executor(self._capture_pool, self.camera.read)
+            if frame is None:
+                print("Failed to grab frame from camera.")
+                self.stop()
+                return
+            self._record("camera", frame.t_read - frame.t_capture)
+            self.frames.put_nowait(frame)
+
+    def _detect(self, frame):
+        start = time.monotonic()
+        img = self.detector.find_pose(frame.img, preview=self.preview_enabled)
+        pose_lms, hand_lms = self.detector.find_position(img, draw=self.preview_enabled)
+        done = time.monotonic()
+        # a motion-gated detector may hand back landmarks from an earlier
+        # frame: keep their origin and leave them out of the latency stats
+        if not getattr(self.detector, "reused", False):
+            self._source = (frame.seq, frame.t_capture)
+            self._record("queue", start - frame.t_read)
+            self._record("pipeline", done - start)
+            self._record("glass_to_landmark", done - frame.t_capture)
+        return Detection(img, pose_lms, hand_lms, *self._source)
+
+    async def _infer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            frame = await self.frames.get()
+            if self._is_stale(frame):
+                self.stale_frames += 1
+                continue
+            det = await loop.run_in_executor(self._infer_pool, self._detect, frame)
+            self.detections.put_nowait(det)
+            self._log_level()
+
+    def _is_stale(self, frame):
+        if self.max_frame_age is None or frame.age <= self.max_frame_age:
+            return False
+        camera_ms = self.latency.get("camera", 0.0)
+        if camera_ms >= self.max_frame_age * 1000:
+            # the next frame would be just as old: dropping would only starve us
+            print(f"[WARN] camera lag ({camera_ms:.0f} ms) alone exceeds "
+                  f"max_frame_age ({self.max_frame_age * 1000:.0f} ms); "
+                  f"no longer dropping stale frames")
+            self.max_frame_age = None
+            return False
+        return True
+
+    def _log_level(self):
+        # one line whenever an adaptive detector changes quality level
+        if not hasattr(self.detector, "stats"):
+            return
+        stats = self.detector.stats()
+        if stats.get("level") is None or stats["level"] == self._level:
+            return
+        self._level = stats["level"]
+        print(self._level_text(stats))
+
+    def _level_text(self, stats):
+        inference = stats.get("inference_ms")
+        return (f"[INFO] detector level {stats['level']} "
+                f"(complexity {stats['model_complexity']}, "
+                f"scale {stats['input_scale']:g}"
+                + (f", {inference:.0f} ms" if inference is not None else "")
+                + ")")
+
+    async def _display(self):
+        while True:
+            img = await self.preview.get()
+            cv2.imshow(self.window, img)
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                self.stop()
+                return
+            if key != 0xFF:
+                self.keys.put_nowait(key)
+
+    async def _run_mode(self):
+        await self.mode(self)
+        self.stop()
+
+    def _on_task_done(self, task):
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None and self._error is None:
+            self._error = exc
+            self.stop()
+
+    # ── lifecycle ─────────────────────────────────────────────────────────────
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            self.camera.open()
+        except RuntimeError:
+            if hasattr(self.detector, "close"):
+                self.detector.close()
+            raise
+        self._stopped = asyncio.Event()
+        self.frames = LatestQueue(self.queue_size)
+        self.detections = LatestQueue(self.queue_size)
+        self.preview = LatestQueue(1)
+        self.keys = LatestQueue(8)
+        try:
+            loop.add_signal_handler(signal.SIGINT, self.stop)
+        except NotImplementedError:  # Windows event loops
+            pass
+
+        tasks = [
+            asyncio.create_task(self._capture()),
+            asyncio.create_task(self._infer()),
+            asyncio.create_task(self._run_mode()),
+        ]
+        if self.preview_enabled:
+            tasks.append(asyncio.create_task(self._display()))
+        for t in tasks:
+            t.add_done_callback(self._on_task_done)
+
+        try:
+            await self._stopped.wait()
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # never abandon the arm mid-command: let the last motion finish
+            if self._motion is not None:
+                await asyncio.gather(self._motion, return_exceptions=True)
+            for pool in (self._capture_pool, self._infer_pool, self._motion_pool):
+                pool.shutdown(wait=True)
+            if hasattr(self.detector, "close"):
+                self.detector.close()
+            self.camera.release()
+            cv2.destroyAllWindows()
+            try:
+                loop.remove_signal_handler(signal.SIGINT)
+            except NotImplementedError:
+                pass
+
+        if self._error is not None:
+            raise self._error
+        self._report()
+
+    def _report(self):
+        lat = self.latency
+        if "glass_to_landmark" not in lat:
+            return
+        source = "driver" if self.camera.driver_timestamps else "grab()"
+        print(f"[INFO] glass→landmark {lat['glass_to_landmark']:.0f} ms "
+              f"(camera {lat['camera']:.0f} ms [{source} timestamps], "
+              f"queue {lat['queue']:.0f} ms, inference {lat['pipeline']:.0f} ms); "
+              f"{self.stale_frames} stale frames dropped")
+        if hasattr(self.detector, "stats"):
+            print(self._level_text(self.detector.stats()))
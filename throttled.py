@@ -1,7 +1,9 @@
 # user for demo vid (iphone)
+import asyncio
 import cv2
 import time
 from pose_estimation import PoseDetector
+from runtime import Runtime
 from xarm import Controller, Servo
 
 # ─── ROBOT SETUP ────────────────────────────────────────────────────────────────
@@ -40,17 +42,12 @@ def move_all(jpos, duration=1000):
     arm.setPosition(servos, duration=duration, wait=True)
     time.sleep(0.5)
 
-def set_claw(position, duration=1000):
-    p = clamp(1, position)
-    current_positions[1] = p
-    move_all(current_positions, duration)
-
 def human_angle_to_servo(joint, angle_deg):
     lo, hi = range_map[joint]
     span = hi - lo
     return int(lo + (angle_deg / 180.0) * span)
 
-def go_to_pose(shoulder_angle, elbow_angle, hand_closed):
+async def go_to_pose(rt, shoulder_angle, elbow_angle, hand_closed):
     # shoulder → servo 4
     sh_p = clamp(4, human_angle_to_servo(4, shoulder_angle))
     # elbow    → servo 3
@@ -59,23 +56,16 @@ def go_to_pose(shoulder_angle, elbow_angle, hand_closed):
     current_positions[3] = el_p
 
     # apply
-    move_all(current_positions)
+    await rt.move(arm, current_positions)
 
     # claw
-    set_claw(closed if hand_closed else opened)
-
+    current_positions[1] = clamp(1, closed if hand_closed else opened)
+    await rt.move(arm, current_positions)
 
 
-def main():
-    cap = cv2.VideoCapture(0)
-    detector = PoseDetector()
-
-    # Neutral start (as before)
-    current_positions.update({2:500, 5:500, 6:500})
-    current_positions[3] = int((range_map[3][0] + range_map[3][1]) / 2)
-    current_positions[4] = int((range_map[4][0] + range_map[4][1]) / 2)
-    current_positions[1] = opened
-    move_all(current_positions)
+# ─── CONTROL MODE ──────────────────────────────────────────────────────────────
+async def auto_follow(rt):
+    detector = rt.detector
 
     # ---- set up your throttling / dead‑zone logic ----
     last_sent_time   = 0.0
@@ -85,12 +75,8 @@ def main():
     last_hand       = None
 
     while True:
-        ret, img = cap.read()
-        if not ret:
-            break
-
-        img = detector.find_pose(img)
-        pose_lms, hand_lms = detector.find_position(img)
+        det = await rt.next_detection()
+        img, pose_lms, hand_lms = det.img, det.pose_lms, det.hand_lms
 
         sh_ang = el_ang = None
         hand_closed = False
@@ -113,6 +99,7 @@ def main():
                         (0,0,255) if hand_closed else (0,255,0), 2)
 
             # decide if we should send a new command:
+            # (actuate() refuses while the previous motion is still running)
             now = time.time()
             moved_enough = (
                 last_sh is None
@@ -120,17 +107,26 @@ def main():
                 or abs(el_ang - last_el) > angle_threshold
                 or (hand_closed != last_hand)
             )
-            if moved_enough and (now - last_sent_time) > min_interval:
-                go_to_pose(sh_ang, el_ang, hand_closed)
+            if (moved_enough and (now - last_sent_time) > min_interval
+                    and rt.actuate(go_to_pose(rt, sh_ang, el_ang, hand_closed))):
                 last_sent_time = now
                 last_sh, last_el, last_hand = sh_ang, el_ang, hand_closed
 
-        cv2.imshow("Auto‑Follow Pose", img)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+        rt.show(img)
+
+
+def main():
+    detector = PoseDetector(frame_budget=1/30, motion_gate=True,
+                            mirror=True)
+
+    # Neutral start (as before)
+    current_positions.update({2:500, 5:500, 6:500})
+    current_positions[3] = int((range_map[3][0] + range_map[3][1]) / 2)
+    current_positions[4] = int((range_map[4][0] + range_map[4][1]) / 2)
+    current_positions[1] = opened
+    move_all(current_positions)
 
-    cap.release()
-    cv2.destroyAllWindows()
+    asyncio.run(Runtime(detector, auto_follow, window="Auto‑Follow Pose").run())
 
 if __name__ == "__main__":
     main()